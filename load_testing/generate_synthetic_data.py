@@ -0,0 +1,180 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+# Columns of the yearly air trafic files, in the order of the original files. The files end with an empty column, which
+# pandas names 'Unnamed: 14' and which is dropped by init_app.
+COLUMNS = ['DEPARTURES_SCHEDULED', 'DEPARTURES_PERFORMED', 'SEATS', 'PASSENGERS', 'DISTANCE', 'CARRIER', 'ORIGIN',
+           'ORIGIN_CITY_NAME', 'DEST', 'DEST_CITY_NAME', 'AIRCRAFT_GROUP', 'AIRCRAFT_TYPE', 'AIRCRAFT_CONFIG', 'MONTH']
+CARRIERS = ['AA', 'AS', 'B6', 'DL', 'F9', 'NK', 'UA', 'WN']
+
+
+def rank_airports(all_airports, random_state=None):
+    """
+    This function orders airports by popularity: large airports first, then medium airports, in a random order within
+    each type.
+    :param all_airports: pandas.DataFrame of the airports, read from us_airports.csv.
+    :param random_state: Seed used to shuffle the airports.
+    :return ranked_airports: pandas.DataFrame of the airports, the most popular first.
+    """
+    random_state = np.random.RandomState(random_state)
+    shuffled_airports = all_airports.iloc[random_state.permutation(len(all_airports))]
+    ranked_airports = pd.concat([shuffled_airports.loc[shuffled_airports['type'] == 'large_airport'],
+                                 shuffled_airports.loc[shuffled_airports['type'] != 'large_airport']])
+
+    return ranked_airports.reset_index(drop=True)
+
+
+def compute_zipf_weights(number_of_items, skew):
+    """
+    This function returns the probabilities of a Zipf distribution: the k-th most popular item is chosen with a
+    probability proportional to 1 / k ** skew. A skew of 0 gives a uniform distribution.
+    :param number_of_items: Integer representing the number of items.
+    :param skew: Float representing the skew of the distribution.
+    :return weights: Array containing the probability of each item, the most popular first.
+    """
+    weights = 1. / np.arange(1, number_of_items + 1) ** skew
+
+    return weights / np.sum(weights)
+
+
+def compute_distance_in_miles(lat_1, lng_1, lat_2, lng_2):
+    """
+    This function computes the great-circle distance between two points with the haversine formula.
+    :param lat_1, lng_1: Floats or arrays representing the latitude and longitude of the first points in degrees.
+    :param lat_2, lng_2: Floats or arrays representing the latitude and longitude of the second points in degrees.
+    :return distance_in_miles: Float or array representing the distance in miles.
+    """
+    lat_1, lng_1, lat_2, lng_2 = np.radians(lat_1), np.radians(lng_1), np.radians(lat_2), np.radians(lng_2)
+    a = np.sin((lat_2 - lat_1) / 2) ** 2 + np.cos(lat_1) * np.cos(lat_2) * np.sin((lng_2 - lng_1) / 2) ** 2
+    distance_in_miles = 2 * 3958.8 * np.arcsin(np.sqrt(a))  # The radius of the Earth is 3958.8 miles
+
+    return distance_in_miles
+
+
+def sample_routes(ranked_airports, number_of_routes, skew, random_state):
+    """
+    This function chooses routes (origin, destination) between airports, popular airports having more routes.
+    :param ranked_airports: pandas.DataFrame of the airports ordered by popularity, as returned by rank_airports.
+    :param number_of_routes: Integer representing the number of routes.
+    :param skew: Float representing the skew of the Zipf distribution of the popularity of the airports.
+    :param random_state: numpy.random.RandomState used to choose the routes.
+    :return origin_indices, dest_indices: Arrays containing the ranks of the origin and destination of each route.
+    """
+    weights = compute_zipf_weights(len(ranked_airports), skew)
+    routes = set()
+    while len(routes) < number_of_routes:
+        origins = random_state.choice(len(ranked_airports), number_of_routes, p=weights)
+        dests = random_state.choice(len(ranked_airports), number_of_routes, p=weights)
+        routes.update((o, d) for o, d in zip(origins, dests) if o != d)
+    routes = sorted(routes)[:number_of_routes]
+    origin_indices = np.array([o for o, _ in routes])
+    dest_indices = np.array([d for _, d in routes])
+
+    return origin_indices, dest_indices
+
+
+def generate_yearly_data(all_airports, dot_to_iata, years, number_of_routes=5000, skew=1.1, random_state=None):
+    """
+    This function generates air trafic data with the same columns as the yearly files used by the server, so that the
+    server can run without the original data. Each route has monthly statistics for one or two aircraft types, a
+    number of passengers depending on the popularity of its airports and a random yearly growth.
+    :param all_airports: pandas.DataFrame of the airports, read from us_airports.csv.
+    :param dot_to_iata: pandas.DataFrame mapping aircraft DOT codes to IATA codes and numbers of seats, read from
+    aircraft_code_final.csv.
+    :param years: List of integers representing the years to generate.
+    :param number_of_routes: Integer representing the number of routes of each year.
+    :param skew: Float representing the skew of the Zipf distribution of the popularity of the airports.
+    :param random_state: Seed used to generate the data. The airports are ranked with rank_airports using the same
+    seed, so that load tests can send more queries to the airports having more trafic.
+    :return data_by_year: Dictionary mapping each year to a pandas.DataFrame.
+    """
+    ranked_airports = rank_airports(all_airports, random_state)
+    random_state = np.random.RandomState(random_state)
+    weights = compute_zipf_weights(len(ranked_airports), skew)
+    origin_indices, dest_indices = sample_routes(ranked_airports, number_of_routes, skew, random_state)
+
+    origins = ranked_airports.iloc[origin_indices]
+    dests = ranked_airports.iloc[dest_indices]
+    distances = np.round(compute_distance_in_miles(origins['latitude'].values, origins['longitude'].values,
+                                                   dests['latitude'].values, dests['longitude'].values))
+    distances = np.maximum(distances, 50)
+
+    # Only aircrafts with more than 100 seats are kept by select_rows
+    aircrafts = dot_to_iata.loc[dot_to_iata['Seats'] >= 100]
+    aircraft_indices = random_state.randint(0, len(aircrafts), size=(number_of_routes, 2))
+    number_of_aircraft_types = random_state.randint(1, 3, size=number_of_routes)
+    carriers = random_state.choice(CARRIERS, number_of_routes)
+
+    # Yearly passengers of each route, more popular airports having more passengers
+    base_passengers = 2e7 * np.sqrt(weights[origin_indices] * weights[dest_indices]) * random_state.lognormal(
+        0, 0.5, number_of_routes) + 5000
+    growth = random_state.normal(0.03, 0.04, number_of_routes)
+
+    data_by_year = {}
+    for y_idx, year in enumerate(years):
+        rows = []
+        yearly_passengers = base_passengers * (1 + growth) ** y_idx * random_state.lognormal(0, 0.05, number_of_routes)
+        for a_idx in range(2):
+            # Routes operated with a second aircraft type split their passengers between the two types
+            routes = np.where(number_of_aircraft_types > a_idx)[0]
+            aircraft = aircrafts.iloc[aircraft_indices[routes, a_idx]]
+            for month in range(1, 13):
+                passengers = np.round(yearly_passengers[routes] / 12 / number_of_aircraft_types[routes]
+                                      * random_state.uniform(0.8, 1.2, len(routes)))
+                departures = np.maximum(np.ceil(passengers / (aircraft['Seats'].values * 0.8)), 1)
+                rows.append(pd.DataFrame({
+                    'DEPARTURES_SCHEDULED': departures,
+                    'DEPARTURES_PERFORMED': departures,
+                    'SEATS': departures * aircraft['Seats'].values,
+                    'PASSENGERS': passengers,
+                    'DISTANCE': distances[routes],
+                    'CARRIER': carriers[routes],
+                    'ORIGIN': origins['iata_code'].values[routes],
+                    'ORIGIN_CITY_NAME': origins['name'].values[routes],
+                    'DEST': dests['iata_code'].values[routes],
+                    'DEST_CITY_NAME': dests['name'].values[routes],
+                    'AIRCRAFT_GROUP': 6,
+                    'AIRCRAFT_TYPE': aircraft['DOT'].values,
+                    'AIRCRAFT_CONFIG': 1,
+                    'MONTH': month}))
+        df = pd.concat(rows, ignore_index=True)[COLUMNS]
+        df[''] = None  # Empty last column, as in the original files
+        data_by_year[year] = df
+
+    return data_by_year
+
+
+if __name__ == "__main__":
+    # This script writes synthetic yearly air trafic files where the server reads the original ones, so that the server
+    # and the load tests can run without the original data.
+    parser = argparse.ArgumentParser(description="Generate synthetic yearly air trafic data.")
+    parser.add_argument("--output", default="Air traffic data/Yearly traffic",
+                        help="directory where the yearly files are written")
+    parser.add_argument("--routes", type=int, default=5000, help="number of routes of each year")
+    parser.add_argument("--skew", type=float, default=1.1, help="skew of the Zipf popularity of the airports")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite the yearly files already present in the output directory")
+    args = parser.parse_args()
+
+    years = list(range(2010, 2020))
+    # The default output directory is where the original data is read from, so we never overwrite it by mistake
+    existing_files = [str(year) + '_data.csv' for year in years
+                      if os.path.exists(os.path.join(args.output, str(year) + '_data.csv'))]
+    if len(existing_files) != 0 and not args.force:
+        print("%s already contains %s. Use --force to overwrite them with synthetic data, or --output to write the "
+              "synthetic data elsewhere." % (args.output, ", ".join(existing_files)))
+        sys.exit(1)
+
+    all_airports = pd.read_csv("Air traffic data/us_airports.csv")
+    dot_to_iata = pd.read_csv('Air traffic data/aircraft_code_final.csv', index_col=False, encoding='UTF-8')
+    data_by_year = generate_yearly_data(all_airports, dot_to_iata, years, args.routes, args.skew,
+                                        args.seed)
+
+    os.makedirs(args.output, exist_ok=True)
+    for year, df in data_by_year.items():
+        df.to_csv(os.path.join(args.output, str(year) + '_data.csv'), index=False, encoding='UTF-8')
+        print("Wrote %d rows for %d" % (len(df), year))
@@ -0,0 +1,311 @@
+import os
+import glob
+import gzip
+import json
+import time
+import argparse
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+if __name__ != "__main__":
+    from load_testing.generate_synthetic_data import rank_airports, compute_zipf_weights, compute_distance_in_miles
+else:
+    from generate_synthetic_data import rank_airports, compute_zipf_weights, compute_distance_in_miles
+
+# Default share of each kind of query, roughly what the web page and the reporting tools send
+DEFAULT_MIX = {"statistics": 0.75, "intervals": 0.05, "leaderboard": 0.12, "hub": 0.08}
+LEADERBOARD_METRICS = ["number_of_people", "carbon_emission", "carbon_emission_per_person"]
+# Driving distances are longer than great-circle distances
+ROAD_DISTANCE_FACTOR = 1.2
+
+
+class QuerySampler:
+    """
+    This class draws queries to the server: the origin and destination of /statistics queries are airports drawn with a
+    Zipf popularity skew, so that a few popular city pairs are asked much more often than the others, like in
+    production.
+    """
+
+    def __init__(self, all_airports, mix=None, skew=1.1, seed=0, hub_airports=None):
+        """
+        :param all_airports: pandas.DataFrame of the airports, read from us_airports.csv.
+        :param mix: Dictionary mapping each kind of query (keys of DEFAULT_MIX) to its share of the queries.
+        :param skew: Float representing the skew of the Zipf distribution of the popularity of the airports.
+        :param seed: Seed used to rank the airports and draw the queries. Using the seed of the synthetic data gives the
+        most queries to the airports having the most trafic.
+        :param hub_airports: Set of the three letter codes of the airports for which the server has air trafic data, or
+        None to use all the airports. /hub queries are only sent for these airports since the server rejects the
+        others.
+        """
+        self.airports = rank_airports(all_airports, seed)
+        self.airport_weights = compute_zipf_weights(len(self.airports), skew)
+        # Airports of /hub queries, with the same popularity as in the other queries
+        is_hub_airport = np.ones(len(self.airports), bool) if hub_airports is None \
+            else self.airports['iata_code'].isin(hub_airports).values
+        if not np.any(is_hub_airport):
+            raise ValueError("None of the airports has air trafic data")
+        self.hub_airports = self.airports.loc[is_hub_airport]
+        self.hub_airport_weights = self.airport_weights[is_hub_airport] / np.sum(self.airport_weights[is_hub_airport])
+        mix = DEFAULT_MIX if mix is None else mix
+        self.kinds = list(mix.keys())
+        self.kind_weights = np.array([mix[kind] for kind in self.kinds], dtype=float) / np.sum(list(mix.values()))
+        self.random_state = np.random.RandomState(seed)
+        self.lock = threading.Lock()
+
+    def sample_airports(self, number_of_airports):
+        return self.airports.iloc[self.random_state.choice(len(self.airports), number_of_airports,
+                                                           p=self.airport_weights)]
+
+    def sample_hub_airports(self, number_of_airports):
+        return self.hub_airports.iloc[self.random_state.choice(len(self.hub_airports), number_of_airports,
+                                                               p=self.hub_airport_weights)]
+
+    def sample_query(self):
+        """
+        This function draws one query.
+        :return kind, method, path, body: Strings representing the kind of the query, the HTTP method and the path with
+        its query string, and the JSON body of the query or None.
+        """
+        with self.lock:  # numpy.random.RandomState is not thread safe
+            kind = self.kinds[self.random_state.choice(len(self.kinds), p=self.kind_weights)]
+
+            if kind in ["statistics", "intervals"]:
+                origin, dest = self.sample_airports(2).itertuples()
+                while dest.iata_code == origin.iata_code:
+                    dest = next(self.sample_airports(1).itertuples())
+                distance = ROAD_DISTANCE_FACTOR * compute_distance_in_miles(origin.latitude, origin.longitude,
+                                                                            dest.latitude, dest.longitude)
+                params = {"origin_lat": origin.latitude, "origin_lng": origin.longitude,
+                          "destination_lat": dest.latitude, "destination_lng": dest.longitude,
+                          "distance": round(distance, 1), "format": "columnar"}
+                if kind == "intervals":
+                    params["quantiles"] = "0.05,0.5,0.95"
+                return kind, "GET", "/statistics?" + urllib.parse.urlencode(params), None
+
+            if kind == "leaderboard":
+                params = {"metric": self.random_state.choice(LEADERBOARD_METRICS),
+                          "limit": self.random_state.choice([10, 50])}
+                if self.random_state.uniform() < 0.5:
+                    params["origin"] = self.sample_airports(1)['iata_code'].values[0]
+                if self.random_state.uniform() < 0.5:
+                    params["year"] = self.random_state.randint(2010, 2020)
+                return kind, "GET", "/leaderboard/routes?" + urllib.parse.urlencode(params), None
+
+            if kind == "hub":
+                airports = self.sample_hub_airports(self.random_state.randint(1, 4))['iata_code'].values
+                params = {"airports": ",".join(airports), "direction": self.random_state.choice(["origin", "dest"])}
+                return kind, "GET", "/hub?" + urllib.parse.urlencode(params), None
+
+        raise ValueError("Unknown kind of query '%s'" % kind)
+
+
+def read_airports_with_trafic(data_directory):
+    """
+    This function returns the airports which appear in the yearly air trafic files served by the server.
+    :param data_directory: String representing the directory of the yearly files, e.g. the output of
+    generate_synthetic_data.py.
+    :return airports: Set of the three letter codes of the airports, or None if there is no yearly file in the
+    directory.
+    """
+    filenames = sorted(glob.glob(os.path.join(data_directory, "*_data.csv")))
+    if len(filenames) == 0:
+        return None
+
+    airports = set()
+    for filename in filenames:
+        df = pd.read_csv(filename, usecols=['ORIGIN', 'DEST'], encoding='UTF-8')
+        airports.update(df['ORIGIN'].unique())
+        airports.update(df['DEST'].unique())
+
+    return airports
+
+
+def send_query(base_url, method, path, body, etags=None, timeout=30.):
+    """
+    This function sends one query to the server, like a browser would: it accepts compressed responses and, if etags is
+    given, revalidates the responses it has already received.
+    :param base_url: String representing the URL of the server, e.g. http://127.0.0.1:5000.
+    :param method: String representing the HTTP method.
+    :param path: String representing the path and the query string.
+    :param body: Dictionary sent as JSON body, or None.
+    :param etags: Dictionary mapping paths to the ETags of the responses already received, shared by all the clients,
+    or None to disable revalidation.
+    :param timeout: Float representing the maximum duration of the query in seconds.
+    :return status, number_of_bytes: Integer representing the HTTP status (0 if the server could not be reached) and
+    integer representing the size of the body received.
+    """
+    headers = {"Accept-Encoding": "gzip"}
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    if etags is not None and path in etags:
+        headers["If-None-Match"] = etags[path]
+
+    query = urllib.request.Request(base_url + path, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(query, timeout=timeout) as response:
+            content = response.read()
+            if response.headers.get("Content-Encoding") == "gzip":
+                gzip.decompress(content)  # A browser would decompress the response before using it
+            if etags is not None and response.headers.get("ETag") is not None:
+                etags[path] = response.headers["ETag"]
+            return response.status, len(content)
+    except urllib.error.HTTPError as e:
+        # urllib reports a 304 Not Modified as an error
+        return e.code, 0
+    except (urllib.error.URLError, OSError):
+        return 0, 0
+
+
+def run_load_test(base_url, sampler, rate, duration, concurrency, revalidate=False, timeout=30.):
+    """
+    This function sends queries to the server at a given rate. The queries are sent at random times (Poisson arrivals)
+    independently of the responses, so a slow server makes the queries queue up like real users would, and the latency
+    of a query is measured from the time it was due to be sent.
+    :param base_url: String representing the URL of the server.
+    :param sampler: QuerySampler used to draw the queries.
+    :param rate: Float representing the number of queries per second.
+    :param duration: Float representing the duration of the test in seconds.
+    :param concurrency: Integer representing the maximum number of queries in flight.
+    :param revalidate: Boolean, True to revalidate the responses already received with their ETag.
+    :param timeout: Float representing the maximum duration of a query in seconds.
+    :return results, elapsed: pandas.DataFrame with one row per query and the columns kind, status, latency (seconds)
+    and bytes, and float representing the duration of the test in seconds.
+    """
+    etags = {} if revalidate else None
+    results = []
+    results_lock = threading.Lock()
+
+    def fire(kind, method, path, body, due_time):
+        try:
+            status, number_of_bytes = send_query(base_url, method, path, body, etags, timeout)
+        except Exception:
+            # Any other failure (truncated or corrupted response, ...) is an error, the query must not be lost
+            status, number_of_bytes = 0, 0
+        latency = time.perf_counter() - due_time
+        with results_lock:
+            results.append((kind, status, latency, number_of_bytes))
+
+    intervals = np.random.RandomState(0).exponential(1. / rate, int(rate * duration * 2) + 10)
+    due_times = np.cumsum(intervals)
+    due_times = due_times[due_times < duration]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for due_time in due_times:
+            delay = start + due_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(fire, *sampler.sample_query(), start + due_time)
+    elapsed = time.perf_counter() - start
+
+    return pd.DataFrame(results, columns=["kind", "status", "latency", "bytes"]), elapsed
+
+
+def summarize(results, elapsed):
+    """
+    This function computes the throughput, the latency percentiles and the error rates of a load test, for all the
+    queries and for each kind of query. Server errors (5xx) and failed queries (status 0: connection refused, timeout,
+    truncated response...) are the errors of the server, whereas client errors (4xx) are queries rejected by the
+    server, which are reported separately.
+    :param results: pandas.DataFrame returned by run_load_test.
+    :param elapsed: Float representing the duration of the test in seconds.
+    :return summary: Dictionary mapping "all" and each kind of query to its statistics.
+    """
+    summary = {}
+    groups = [("all", results)] + list(results.groupby("kind"))
+    for name, group in groups:
+        status = group["status"].values
+        server_errors = (status >= 500) & (status < 600)
+        failures = status == 0
+        client_errors = (status >= 400) & (status < 500)
+        latencies_ms = group["latency"].values * 1000
+        summary[name] = {
+            "queries": int(len(group)),
+            "throughput": len(group) / elapsed if elapsed > 0 else 0.,
+            "p50_ms": float(np.percentile(latencies_ms, 50)) if len(group) != 0 else None,
+            "p95_ms": float(np.percentile(latencies_ms, 95)) if len(group) != 0 else None,
+            "p99_ms": float(np.percentile(latencies_ms, 99)) if len(group) != 0 else None,
+            "error_rate": float(np.mean(server_errors | failures)) if len(group) != 0 else 0.,
+            "server_error_rate": float(np.mean(server_errors)) if len(group) != 0 else 0.,
+            "failure_rate": float(np.mean(failures)) if len(group) != 0 else 0.,
+            "client_error_rate": float(np.mean(client_errors)) if len(group) != 0 else 0.,
+            "not_modified": int(np.sum(group["status"] == 304)),
+            "mean_bytes": float(np.mean(group["bytes"])) if len(group) != 0 else 0.}
+
+    return summary
+
+
+def print_summary(summary):
+    if summary["all"]["queries"] == 0:
+        print("No query was sent, increase the rate or the duration of the test.")
+        return
+
+    # errors = 5xx + failed, the queries which the server did not answer correctly
+    print("%-12s %8s %10s %9s %9s %9s %8s %8s %8s %8s %6s %10s" % (
+        "kind", "queries", "queries/s", "p50 ms", "p95 ms", "p99 ms", "errors", "5xx", "failed", "4xx", "304",
+        "bytes"))
+    for name, stats in summary.items():
+        print("%-12s %8d %10.1f %9.1f %9.1f %9.1f %7.2f%% %7.2f%% %7.2f%% %7.2f%% %6d %10.0f" % (
+            name, stats["queries"], stats["throughput"], stats["p50_ms"], stats["p95_ms"], stats["p99_ms"],
+            100 * stats["error_rate"], 100 * stats["server_error_rate"], 100 * stats["failure_rate"],
+            100 * stats["client_error_rate"], stats["not_modified"], stats["mean_bytes"]))
+
+
+def parse_mix(mix):
+    """
+    This function parses a query mix given on the command line, e.g. "statistics=0.8,leaderboard=0.2".
+    :param mix: String representing the share of each kind of query.
+    :return mix: Dictionary mapping each kind of query to its share.
+    """
+    parsed_mix = {}
+    for item in mix.split(","):
+        kind, share = item.split("=")
+        if kind not in DEFAULT_MIX:
+            raise ValueError("Unknown kind of query '%s', expected one of %s" % (kind, ", ".join(DEFAULT_MIX)))
+        parsed_mix[kind] = float(share)
+
+    return parsed_mix
+
+
+if __name__ == "__main__":
+    # This script replays a realistic mix of queries against a running server and reports its throughput, latency and
+    # error rate. The server can run offline on synthetic data, see generate_synthetic_data.py.
+    parser = argparse.ArgumentParser(description="Load test the air trafic statistics server.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="URL of the server")
+    parser.add_argument("--rate", type=float, default=20., help="number of queries per second")
+    parser.add_argument("--duration", type=float, default=30., help="duration of the test in seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="maximum number of queries in flight")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="share of each kind of query, e.g. statistics=0.75,intervals=0.05,leaderboard=0.12,hub=0.08")
+    parser.add_argument("--skew", type=float, default=1.1, help="skew of the Zipf popularity of the airports")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to rank the airports and draw the queries")
+    parser.add_argument("--data", default="Air traffic data/Yearly traffic",
+                        help="directory of the yearly files served by the server, /hub queries are only sent for their "
+                             "airports")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="send the ETag of the responses already received, like a browser cache")
+    parser.add_argument("--timeout", type=float, default=30., help="maximum duration of a query in seconds")
+    parser.add_argument("--json", help="file where the summary is written as JSON")
+    args = parser.parse_args()
+
+    hub_airports = read_airports_with_trafic(args.data)
+    if hub_airports is None:
+        print("No yearly file in %s, /hub queries are sent for all the airports and some of them will be rejected "
+              "(4xx)." % args.data)
+    sampler = QuerySampler(pd.read_csv("Air traffic data/us_airports.csv"), args.mix, args.skew, args.seed,
+                           hub_airports)
+    results, elapsed = run_load_test(args.url, sampler, args.rate, args.duration, args.concurrency, args.revalidate,
+                                     args.timeout)
+    summary = summarize(results, elapsed)
+    print_summary(summary)
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
@@ -134,3 +134,95 @@ def full_prediction_AR(past_statistics, order_AR, number_of_next_statistics):
     next_statistics = predict_next_statistics(A_prediction, parameters, order_AR)
 
     return next_statistics
+
+
+def compute_parameters_and_residuals(past_statistics, order_AR):
+    """
+    This function computes the parameters of one AR model per time series, and the residuals of each model on the past
+    data, for several time series at once.
+    :param past_statistics: Array of shape (number_of_series, number_of_past_statistics) where each row contains the
+    past data of one time series (for instance one route).
+    :param order_AR: Integer representing the order of the AR model, i.e. the number of parameters of each model.
+    :return parameters, residuals: Arrays of shape (number_of_series, order_AR) and
+    (number_of_series, number_of_past_statistics - order_AR) containing respectively the parameters of each AR model
+    and the residuals b - AX of each AR model.
+    """
+    past_statistics = np.asarray(past_statistics, dtype=float)
+    number_of_rows = past_statistics.shape[1] - order_AR
+
+    # We build the matrices A and b of create_matrices_used_to_compute_parameters for every time series at once.
+    # A[s][i][j] = past_statistics[s][i + j]
+    indices = np.arange(number_of_rows)[:, None] + np.arange(order_AR)[None, :]
+    A = past_statistics[:, indices]
+    b = past_statistics[:, order_AR:]
+
+    # np.linalg.pinv works on stacks of matrices, so all the pseudo-inverses are computed in a single call
+    parameters = np.einsum('spn,sn->sp', np.linalg.pinv(A), b)
+    residuals = b - np.einsum('snp,sp->sn', A, parameters)
+
+    return parameters, residuals
+
+
+def bootstrap_prediction_AR(past_statistics, order_AR, number_of_next_statistics, number_of_paths=2000,
+                            random_state=None):
+    """
+    This function simulates future paths of several time series using residual bootstrap on their AR models.
+    For each time series, an AR model is fitted on the past data. Each simulated path is then computed using one-step
+    ahead prediction, as in predict_next_statistics, except that at each step a centered residual of the model, drawn
+    at random with replacement, is added to the predicted value. The paths of all the time series are simulated at once.
+    :param past_statistics: Array of shape (number_of_series, number_of_past_statistics) where each row contains the
+    past data of one time series. A one-dimensional array is treated as a single time series.
+    :param order_AR: Integer representing the order of the AR models.
+    :param number_of_next_statistics: Integer representing the number of future values that we wish to simulate.
+    :param number_of_paths: Integer representing the number of paths simulated for each time series.
+    :param random_state: Seed or numpy.random.RandomState used to draw the residuals.
+    :return paths: Array of shape (number_of_series, number_of_paths, number_of_next_statistics) containing the
+    simulated future values of each time series.
+    """
+    past_statistics = np.atleast_2d(np.asarray(past_statistics, dtype=float))
+    number_of_series = past_statistics.shape[0]
+    if not isinstance(random_state, np.random.RandomState):
+        random_state = np.random.RandomState(random_state)
+
+    parameters, residuals = compute_parameters_and_residuals(past_statistics, order_AR)
+    # The model has no intercept so its residuals do not have a zero mean. We center them so that the paths are spread
+    # around the predictions of predict_next_statistics instead of drifting away from them.
+    residuals = residuals - np.mean(residuals, axis=1, keepdims=True)
+
+    # We draw all the residuals needed by all the paths of all the time series beforehand
+    drawn_indices = random_state.randint(0, residuals.shape[1],
+                                         size=(number_of_series, number_of_paths * number_of_next_statistics))
+    drawn_residuals = np.take_along_axis(residuals, drawn_indices, axis=1).reshape(
+        (number_of_series, number_of_paths, number_of_next_statistics))
+
+    # The last order_AR values of each path, the most recent one being the last one
+    last_statistics = np.repeat(past_statistics[:, None, -order_AR:], number_of_paths, axis=1)
+    paths = np.zeros((number_of_series, number_of_paths, number_of_next_statistics))
+    for k in range(number_of_next_statistics):
+        paths[:, :, k] = np.einsum('skp,sp->sk', last_statistics, parameters) + drawn_residuals[:, :, k]
+        last_statistics = np.concatenate((last_statistics[:, :, 1:], paths[:, :, k:k + 1]), axis=2)
+
+    return paths
+
+
+def prediction_intervals_AR(past_statistics, order_AR, number_of_next_statistics, quantiles=(0.05, 0.5, 0.95),
+                            number_of_paths=2000, random_state=None):
+    """
+    This function computes quantiles of the future values of the sum of several time series.
+    Each time series (for instance the number of people travelling between one origin airport and one destination
+    airport) is simulated with bootstrap_prediction_AR, then the simulated paths are summed over the time series so
+    that the quantiles describe the total, like the statistics returned to the user.
+    :param past_statistics: Array of shape (number_of_series, number_of_past_statistics) containing past data.
+    :param order_AR: Integer representing the order of the AR models.
+    :param number_of_next_statistics: Integer representing the number of future values that we wish to predict.
+    :param quantiles: List of floats between 0 and 1 representing the quantiles that we wish to compute.
+    :param number_of_paths: Integer representing the number of paths simulated for each time series.
+    :param random_state: Seed or numpy.random.RandomState used to draw the residuals.
+    :return next_quantiles: Array of shape (len(quantiles), number_of_next_statistics) containing the quantiles of the
+    predicted total for each future value.
+    """
+    paths = bootstrap_prediction_AR(past_statistics, order_AR, number_of_next_statistics, number_of_paths,
+                                    random_state)
+    next_quantiles = np.quantile(np.sum(paths, axis=0), quantiles, axis=0)
+
+    return next_quantiles
@@ -0,0 +1,96 @@
+import sys
+import time
+import numpy as np
+
+if __name__ != "__main__":
+    from predictions.AR import prediction_intervals_AR
+    from predictions.prediction import create_statistics
+else:
+    from AR import prediction_intervals_AR
+    from prediction import create_statistics
+
+
+def generate_synthetic_past_statistics(number_of_series, number_of_past_statistics, random_state=None):
+    """
+    This function generates past statistics looking like yearly air trafic data, i.e. noisy series with a trend.
+    :param number_of_series: Integer representing the number of time series (for instance the number of city pairs).
+    :param number_of_past_statistics: Integer representing the number of past years of each time series.
+    :param random_state: Seed used to generate the data.
+    :return past_statistics: Array of shape (number_of_series, number_of_past_statistics).
+    """
+    random_state = np.random.RandomState(random_state)
+    levels = random_state.uniform(1e4, 1e6, size=(number_of_series, 1))
+    trends = random_state.uniform(-0.05, 0.1, size=(number_of_series, 1))
+    years = np.arange(number_of_past_statistics)[None, :]
+    noise = random_state.normal(0, 0.05, size=(number_of_series, number_of_past_statistics))
+    past_statistics = (levels * (1 + trends * years) * (1 + noise)).astype(int)
+
+    return past_statistics
+
+
+def benchmark_prediction_intervals(number_of_series=1, number_of_past_statistics=10, number_of_next_statistics=6,
+                                   order_AR=3, number_of_paths=2000, number_of_runs=20):
+    """
+    This function measures the time needed to compute the prediction intervals of the number of people and of the
+    carbon emissions of a request, as done by create_statistics.
+    :param number_of_series: Integer representing the number of time series simulated at once. Requests simulate one
+    time series per statistic, the total of all their city pairs returned by get_metro_totals.
+    :param number_of_past_statistics: Integer representing the number of years for which we have air trafic data.
+    :param number_of_next_statistics: Integer representing the number of years to predict.
+    :param order_AR: Integer representing the order of the AR model.
+    :param number_of_paths: Integer representing the number of bootstrap paths simulated for each time series.
+    :param number_of_runs: Integer representing the number of times the computation is repeated.
+    :return timings: Array containing the duration in seconds of each run.
+    """
+    past_statistics_people = generate_synthetic_past_statistics(number_of_series, number_of_past_statistics, 0)
+    past_statistics_CO2 = generate_synthetic_past_statistics(number_of_series, number_of_past_statistics, 1) * 100
+
+    timings = np.zeros(number_of_runs)
+    for k in range(number_of_runs):
+        start = time.perf_counter()
+        # The number of people and the carbon emissions are both predicted for each request
+        prediction_intervals_AR(past_statistics_people, order_AR, number_of_next_statistics,
+                                number_of_paths=number_of_paths)
+        prediction_intervals_AR(past_statistics_CO2, order_AR, number_of_next_statistics,
+                                number_of_paths=number_of_paths)
+        timings[k] = time.perf_counter() - start
+
+    return timings
+
+
+def check_reproducible_intervals(number_of_past_statistics=10, number_of_next_statistics=6, order_AR=3,
+                                 quantiles=(0.05, 0.5, 0.95)):
+    """
+    This function checks that the same request always gets the same prediction intervals, since they are used in
+    reports and HTTP responses are cached by clients.
+    :param number_of_past_statistics: Integer representing the number of years for which we have air trafic data.
+    :param number_of_next_statistics: Integer representing the number of years to predict.
+    :param order_AR: Integer representing the order of the AR model.
+    :param quantiles: List of floats between 0 and 1 representing the quantiles of the prediction intervals.
+    :return reproducible: Boolean, True if two identical calls to create_statistics return the same statistics.
+    """
+    past_years = [str(2010 + k) for k in range(number_of_past_statistics)]
+    past_statistics_people = generate_synthetic_past_statistics(1, number_of_past_statistics, 0)[0]
+    past_statistics_CO2 = generate_synthetic_past_statistics(1, number_of_past_statistics, 1)[0] * 100
+
+    statistics = [create_statistics(past_years, past_statistics_people, past_statistics_CO2, number_of_next_statistics,
+                                    order_AR, list(quantiles), 2000) for _ in range(2)]
+
+    return statistics[0] == statistics[1]
+
+
+if __name__ == "__main__":
+    # This script checks that computing the prediction intervals of a request stays within the latency budget, given in
+    # milliseconds as first argument, and that the same request always gets the same prediction intervals.
+    latency_budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 50.
+
+    timings = benchmark_prediction_intervals()
+    median_ms = np.median(timings) * 1000
+    print("Prediction intervals: median %.1f ms, max %.1f ms (budget %.1f ms)"
+          % (median_ms, np.max(timings) * 1000, latency_budget_ms))
+
+    reproducible = check_reproducible_intervals()
+    print("Prediction intervals reproducible: %s" % reproducible)
+
+    if median_ms > latency_budget_ms or not reproducible:
+        sys.exit(1)
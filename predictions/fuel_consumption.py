@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 
 
@@ -181,6 +182,54 @@ def compute_CO2_emissions(origin, dest, year, data_by_year, coefs_of_dot_codes):
     return CO2_kg
 
 
+def evaluate_polynomials(coefs, x):
+    """
+    This function evaluates a different polynomial model on each input value, like np.polyval does for one model.
+    :param coefs: Array of shape (number_of_values, degree + 1) where each row contains the coefficients of a
+    polynomial model, highest degree first.
+    :param x: Array containing the input values.
+    :return y: Array containing the output values.
+    """
+    y = np.zeros(len(x))
+    for k in range(coefs.shape[1]):
+        y = y * x + coefs[:, k]
+
+    return y
+
+
+def compute_CO2_emissions_of_all_routes(df, coefs_of_dot_codes):
+    """
+    This function computes the number of passengers and the CO2 emissions of every route (origin, destination) of one
+    year of air trafic data at once. It gives the same results as count_people_air_travelling and
+    compute_CO2_emissions called on every route, without looping over the routes.
+    :param df: pandas.DataFrame corresponding to air trafic data of a specific year, as returned by select_rows.
+    :param coefs_of_dot_codes: Dictionary containing the polynomial fuel consumption model of different aircrafts.
+    :return routes: pandas.DataFrame with one row per route and the columns ORIGIN, DEST, PASSENGERS and CO2.
+    """
+    # We gather the models in arrays. The model of the special key 0 is put last so that the aircrafts which are not
+    # part of coefs_of_dot_codes (index -1) use it.
+    dot_codes = [code for code in coefs_of_dot_codes if code != 0]
+    default_coefs = coefs_of_dot_codes[0]["coefs"]
+    all_coefs = np.array([default_coefs if coefs_of_dot_codes[code]["coefs"] is None
+                          else coefs_of_dot_codes[code]["coefs"] for code in dot_codes] + [default_coefs])
+    all_seats = np.array([coefs_of_dot_codes[code]["seats"] for code in dot_codes] + [coefs_of_dot_codes[0]["seats"]],
+                         dtype=float)
+    model_indices = pd.Index(dot_codes).get_indexer(df['AIRCRAFT_TYPE'])
+
+    # Like get_flight_distance we use the distance of the first row of each route
+    flight_distance = df.groupby(['ORIGIN', 'DEST'])['DISTANCE'].transform('first').values
+    estimated_number_of_flights = np.round(df['PASSENGERS'].values / all_seats[model_indices])
+    fuel_consumption_kg = evaluate_polynomials(all_coefs[model_indices], flight_distance) * estimated_number_of_flights
+
+    routes = pd.DataFrame({'ORIGIN': df['ORIGIN'].values, 'DEST': df['DEST'].values,
+                           'PASSENGERS': df['PASSENGERS'].values, 'FUEL': fuel_consumption_kg})
+    routes = routes.groupby(['ORIGIN', 'DEST'], as_index=False, sort=True).sum()
+    # We convert the fuel consumption in kg to CO2 consumption in kg
+    routes['CO2'] = np.round(routes['FUEL'] * 3.15)
+
+    return routes.drop(['FUEL'], axis=1)
+
+
 def plot_aircraft_codes_histogram(data_by_year):
     """
     This is an accessory function to obtain the most commonly used aircraft for flights, and plot a histogram of aircraft
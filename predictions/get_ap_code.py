@@ -1,24 +1,14 @@
 import pandas as pd
 
-def get_ap_codes(all_airports, lat_lng_or, lat_lng_dest):
+def get_nearby_airports(all_airports, lat_lng):
         """
-        This function accepts the latitude and longitude of the origin destination pairs, and returns all airports in close proximity to the coordinates.
-        E.g. using (40.713,-74.006) for either coordinate returns "LGA","EWR","ISP" and "JFK" - the airports serving NYC.
+        This function accepts the latitude and longitude of a location, and returns all airports in close proximity to the coordinates.
         :param all_airports: List of all airports in mainland US along with coordinates
-        :param lat_lng_or: latitude & longitude of origin as tuple
-        :param lat_lng_dest: latitude & longitude of destination as tuple
-        :return city_pairs: list of tuples of (origin,destination)
+        :param lat_lng: latitude & longitude of the location as tuple
+        :return airports: array of the three-letter codes of the airports
         """
-        lat_or,lng_or = lat_lng_or
-        lat_dest,lng_dest = lat_lng_dest
+        lat,lng = lat_lng
 
-        orig_data = all_airports['iata_code'][(abs(all_airports['latitude'] - lat_or) < 0.4) & (abs(all_airports['longitude'] - lng_or) < 0.4)].values
-        dest_data = all_airports['iata_code'][(abs(all_airports['latitude'] - lat_dest) < 0.4) & (abs(all_airports['longitude'] - lng_dest) < 0.4)].values
+        airports = all_airports['iata_code'][(abs(all_airports['latitude'] - lat) < 0.4) & (abs(all_airports['longitude'] - lng) < 0.4)].values
 
-        city_pairs = []
-        for orig in orig_data:
-                for dest in dest_data:
-                        citypair = (orig,dest)
-                        city_pairs.append(citypair)
-
-        return city_pairs
+        return airports
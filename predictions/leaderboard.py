@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+# Statistics by which routes and airports can be ranked
+METRICS = ["number_of_people", "carbon_emission", "carbon_emission_per_person"]
+
+# Key of the leaderboards gathering all the years for which we have air trafic data
+ALL_YEARS = "all"
+
+# Maximum number of rows returned by a ranked query
+MAX_NUMBER_OF_ROWS = 1000
+
+
+def group_sorted_indices(sorted_indices, keys):
+    """
+    This function splits sorted indices by the value of a key column, keeping their order within each group, e.g. the
+    routes ranked by a metric split by origin airport.
+    :param sorted_indices: Array containing the indices of the rows, in order.
+    :param keys: Array containing the key of each row.
+    :return grouped_indices: Dictionary mapping each key to the array of the indices of its rows, in order.
+    """
+    sorted_keys = keys[sorted_indices]
+    # A stable sort by key keeps the rows of each key in the order of sorted_indices
+    order = np.argsort(sorted_keys, kind='stable')
+    grouped_keys, starts = np.unique(sorted_keys[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    grouped_indices = sorted_indices[order]
+
+    return {key: grouped_indices[start:end] for key, start, end in zip(grouped_keys, starts, ends)}
+
+
+def create_leaderboard(df, key_columns, grouped_columns=()):
+    """
+    This function arranges statistics into arrays and sorts them once and for all for each metric, so that ranked
+    queries do not need to sort anything.
+    :param df: pandas.DataFrame containing the columns key_columns, PASSENGERS and CO2, with one row per route or
+    airport.
+    :param key_columns: List of the columns identifying a row, e.g. ['ORIGIN', 'DEST'] for routes.
+    :param grouped_columns: List of the key columns by which ranked queries can be filtered, e.g. ['ORIGIN', 'DEST']
+    for routes.
+    :return leaderboard: Dictionary containing one array per key column (in lower case), one array per metric, under
+    the key "sorted_indices", the indices of the rows sorted by decreasing value of each metric and, under the key
+    "grouped_sorted_indices", for each grouped column (in lower case) then each metric, a dictionary mapping each value
+    of the column to the sorted indices of its rows.
+    """
+    leaderboard = {column.lower(): df[column].values for column in key_columns}
+    leaderboard["number_of_people"] = df['PASSENGERS'].values.astype(int)
+    leaderboard["carbon_emission"] = df['CO2'].values.astype(int)
+    leaderboard["carbon_emission_per_person"] = df['CO2'].values / df['PASSENGERS'].values
+
+    # A stable sort keeps the rows in alphabetical order when several rows have the same value
+    leaderboard["sorted_indices"] = {metric: np.argsort(-leaderboard[metric], kind='stable') for metric in METRICS}
+    # Filtered queries, e.g. the routes out of one airport, only read the rows of their group
+    leaderboard["grouped_sorted_indices"] = {}
+    for column in grouped_columns:
+        leaderboard["grouped_sorted_indices"][column.lower()] = {
+            metric: group_sorted_indices(leaderboard["sorted_indices"][metric], leaderboard[column.lower()])
+            for metric in METRICS}
+
+    return leaderboard
+
+
+def init_leaderboards(routes_by_year):
+    """
+    This function gathers the statistics of every route and every airport for every year and sorts them.
+    :param routes_by_year: Dictionary mapping each year to a pandas.DataFrame with one row per route and the columns
+    ORIGIN, DEST, PASSENGERS and CO2, as returned by compute_CO2_emissions_of_all_routes.
+    :return route_leaderboards, airport_leaderboards: Dictionaries mapping each year (and ALL_YEARS) to the leaderboard
+    of the routes, and each direction ("origin" or "dest") then each year (and ALL_YEARS) to the leaderboard of the
+    airports.
+    """
+    routes_by_year = dict(routes_by_year)
+    routes_by_year[ALL_YEARS] = pd.concat(list(routes_by_year.values())).groupby(
+        ['ORIGIN', 'DEST'], as_index=False, sort=True).sum()
+
+    route_leaderboards = {}
+    airport_leaderboards = {"origin": {}, "dest": {}}
+    for year_str, routes in routes_by_year.items():
+        route_leaderboards[year_str] = create_leaderboard(routes, ['ORIGIN', 'DEST'], ['ORIGIN', 'DEST'])
+        # Outbound statistics of each airport are gathered by origin, inbound statistics by destination
+        for direction in airport_leaderboards:
+            airports = routes.drop(['DEST' if direction == "origin" else 'ORIGIN'], axis=1).groupby(
+                [direction.upper()], as_index=False, sort=True).sum()
+            airport_leaderboards[direction][year_str] = create_leaderboard(airports, [direction.upper()])
+
+    return route_leaderboards, airport_leaderboards
+
+
+def get_leaderboard(leaderboards, metric, year, number_of_rows):
+    """
+    This function checks the parameters of a ranked query and returns the corresponding leaderboard.
+    :param leaderboards: Dictionary mapping each year to a leaderboard produced by create_leaderboard.
+    :param metric: String representing the metric used to rank the rows, one of METRICS.
+    :param year: Integer representing the year, or None for all the years.
+    :param number_of_rows: Integer representing the maximum number of rows returned, between 1 and
+    MAX_NUMBER_OF_ROWS.
+    :return leaderboard: The leaderboard of the year.
+    """
+    if not 1 <= number_of_rows <= MAX_NUMBER_OF_ROWS:
+        raise ValueError("The number of rows must be between 1 and %d" % MAX_NUMBER_OF_ROWS)
+    if metric not in METRICS:
+        raise ValueError("Unknown metric '%s', expected one of %s" % (metric, ", ".join(METRICS)))
+    year_str = ALL_YEARS if year is None else str(year)
+    if year_str not in leaderboards:
+        raise ValueError("No air trafic data for the year %s" % year)
+
+    return leaderboards[year_str]
+
+
+def format_rows(leaderboard, indices, key_columns, year):
+    """
+    This function converts rows of a leaderboard into a list of dictionaries which can be returned to the user.
+    :param leaderboard: Leaderboard produced by create_leaderboard.
+    :param indices: Array containing the indices of the rows to convert, in order.
+    :param key_columns: List of the keys identifying a row, e.g. ["origin", "dest"].
+    :param year: Integer representing the year, or None for all the years.
+    :return rows: list of dictionaries containing the statistics of each row.
+    """
+    rows = []
+    for idx in indices:
+        row = {column: str(leaderboard[column][idx]) for column in key_columns}
+        row["year"] = year
+        row["number_of_people"] = int(leaderboard["number_of_people"][idx])
+        row["carbon_emission"] = int(leaderboard["carbon_emission"][idx])
+        row["carbon_emission_per_person"] = float(leaderboard["carbon_emission_per_person"][idx])
+        rows.append(row)
+
+    return rows
+
+
+def get_top_routes(route_leaderboards, metric="number_of_people", year=None, origin=None, dest=None,
+                   number_of_routes=50):
+    """
+    This function returns the routes with the highest value of a metric, e.g. the 50 highest-CO2 routes out of ORD in
+    2019. The routes are already sorted and grouped by origin and by destination, so a filtered query only reads the
+    routes of its airport.
+    :param route_leaderboards: Dictionary mapping each year to the leaderboard of the routes, produced by
+    init_leaderboards.
+    :param metric: String representing the metric used to rank the routes, one of METRICS.
+    :param year: Integer representing the year, or None to rank the routes over all the years.
+    :param origin: String representing the three letter code of the origin airport, or None for any origin.
+    :param dest: String representing the three letter code of the destination airport, or None for any destination.
+    :param number_of_routes: Integer representing the maximum number of routes returned, at most MAX_NUMBER_OF_ROWS.
+    :return routes: list of dictionaries containing the statistics of each route, ranked by decreasing value of the
+    metric.
+    """
+    leaderboard = get_leaderboard(route_leaderboards, metric, year, number_of_routes)
+
+    # Airport codes are stored in capital letters
+    grouped_sorted_indices = leaderboard["grouped_sorted_indices"]
+    empty = np.zeros(0, int)
+    if origin is not None:
+        sorted_indices = grouped_sorted_indices["origin"][metric].get(origin.upper(), empty)
+        if dest is not None:
+            # A route is identified by its origin and its destination, so at most one route is left
+            sorted_indices = sorted_indices[leaderboard["dest"][sorted_indices] == dest.upper()]
+    elif dest is not None:
+        sorted_indices = grouped_sorted_indices["dest"][metric].get(dest.upper(), empty)
+    else:
+        sorted_indices = leaderboard["sorted_indices"][metric]
+
+    return format_rows(leaderboard, sorted_indices[:number_of_routes], ["origin", "dest"], year)
+
+
+def get_top_airports(airport_leaderboards, metric="number_of_people", year=None, direction="origin",
+                     number_of_airports=50):
+    """
+    This function returns the airports with the highest value of a metric, e.g. the busiest airports of the network.
+    :param airport_leaderboards: Dictionary mapping each direction then each year to the leaderboard of the airports,
+    produced by init_leaderboards.
+    :param metric: String representing the metric used to rank the airports, one of METRICS.
+    :param year: Integer representing the year, or None to rank the airports over all the years.
+    :param direction: String, "origin" to rank airports by their outbound statistics or "dest" by their inbound
+    statistics.
+    :param number_of_airports: Integer representing the maximum number of airports returned, at most
+    MAX_NUMBER_OF_ROWS.
+    :return airports: list of dictionaries containing the statistics of each airport, ranked by decreasing value of the
+    metric.
+    """
+    if direction not in airport_leaderboards:
+        raise ValueError("Unknown direction '%s', expected 'origin' or 'dest'" % direction)
+    leaderboard = get_leaderboard(airport_leaderboards[direction], metric, year, number_of_airports)
+
+    sorted_indices = leaderboard["sorted_indices"][metric][:number_of_airports]
+
+    return format_rows(leaderboard, sorted_indices, [direction], year)
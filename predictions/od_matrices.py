@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Statistics stored in the origin x destination matrices, with the corresponding column of the routes data
+STATISTICS = {"number_of_people": 'PASSENGERS', "carbon_emission": 'CO2'}
+
+
+def init_od_matrices(routes_by_year):
+    """
+    This function stores the statistics of every route as sparse airport x airport matrices, so that the statistics of
+    several origin and destination airports can be summed with matrix operations instead of looping over the routes.
+    :param routes_by_year: Dictionary mapping each year to a pandas.DataFrame with one row per route and the columns
+    ORIGIN, DEST, PASSENGERS and CO2, as returned by compute_CO2_emissions_of_all_routes.
+    :return od_matrices: Dictionary containing:
+    - "years": list of the years, sorted.
+    - "airports": array of the three letter codes of the airports. The i-th row and column of the matrices correspond to
+    the i-th airport.
+    - "airport_index": pandas.Index mapping three letter codes to rows and columns of the matrices.
+    - for each statistic (number_of_people, carbon_emission) a dictionary containing "by_year", a list of CSR matrices
+    M[origin, destination] (one per year), "all_years", a CSC matrix of shape (number_of_years,
+    number_of_airports ** 2) stacking the flattened matrices of all the years, stored by column so that the columns of a
+    few routes are read without going through the others, and "outbound" and "inbound", arrays of
+    shape (number_of_years, number_of_airports) containing the row and column sums of the matrices.
+    """
+    years = sorted(routes_by_year.keys())
+    airports = np.unique(np.concatenate([np.concatenate((routes_by_year[year_str]['ORIGIN'].values,
+                                                         routes_by_year[year_str]['DEST'].values))
+                                         for year_str in years]))
+    airport_index = pd.Index(airports)
+    number_of_airports = len(airports)
+
+    od_matrices = {"years": [int(year_str) for year_str in years], "airports": airports, "airport_index": airport_index}
+    for statistic, column in STATISTICS.items():
+        by_year = []
+        tensor_rows, tensor_columns, tensor_values = [], [], []
+        for y_idx, year_str in enumerate(years):
+            routes = routes_by_year[year_str]
+            origin_indices = airport_index.get_indexer(routes['ORIGIN'])
+            dest_indices = airport_index.get_indexer(routes['DEST'])
+            values = routes[column].values.astype(float)
+            by_year.append(sparse.csr_matrix((values, (origin_indices, dest_indices)),
+                                             shape=(number_of_airports, number_of_airports)))
+
+            # In the stacked tensor, route (origin, destination) of a year is stored in the column
+            # origin * number_of_airports + destination of the row of the year
+            tensor_rows.append(np.full(len(values), y_idx))
+            tensor_columns.append(origin_indices * number_of_airports + dest_indices)
+            tensor_values.append(values)
+
+        all_years = sparse.csc_matrix((np.concatenate(tensor_values),
+                                       (np.concatenate(tensor_rows), np.concatenate(tensor_columns))),
+                                      shape=(len(years), number_of_airports * number_of_airports))
+        od_matrices[statistic] = {
+            "by_year": by_year,
+            "all_years": all_years,
+            "outbound": np.array([np.asarray(m.sum(axis=1)).ravel() for m in by_year]),
+            "inbound": np.array([np.asarray(m.sum(axis=0)).ravel() for m in by_year])}
+
+    return od_matrices
+
+
+def get_airport_indices(od_matrices, airport_codes):
+    """
+    This function returns the rows (or columns) of the matrices corresponding to airports. Airports for which we have
+    no air trafic data are ignored.
+    :param od_matrices: Dictionary produced by init_od_matrices.
+    :param airport_codes: List of strings representing three letter codes of airports.
+    :return indices: Array containing the indices of the airports in the matrices.
+    """
+    indices = od_matrices["airport_index"].get_indexer(list(airport_codes))
+
+    return indices[indices != -1]
+
+
+def get_unknown_airports(od_matrices, airport_codes):
+    """
+    This function returns the airports for which we have no air trafic data, which are ignored by the queries.
+    :param od_matrices: Dictionary produced by init_od_matrices.
+    :param airport_codes: List of strings representing three letter codes of airports.
+    :return unknown_airports: List of the codes of the airports which are not in the matrices.
+    """
+    indices = od_matrices["airport_index"].get_indexer(list(airport_codes))
+
+    return [code for code, idx in zip(airport_codes, indices) if idx == -1]
+
+
+def get_metro_totals(od_matrices, statistic, origins, dests):
+    """
+    This function returns, for every year, the total of a statistic between two groups of airports, e.g. all the
+    airports near two cities, i.e. the sum of the submatrix of the origin airports and the destination airports.
+    :param od_matrices: Dictionary produced by init_od_matrices.
+    :param statistic: String representing the statistic, one of STATISTICS.
+    :param origins: List of strings representing the three letter codes of the origin airports.
+    :param dests: List of strings representing the three letter codes of the destination airports.
+    :return totals: Array containing the total for each year of od_matrices["years"].
+    """
+    origin_indices = get_airport_indices(od_matrices, origins)
+    dest_indices = get_airport_indices(od_matrices, dests)
+    number_of_airports = len(od_matrices["airports"])
+
+    # Columns of the stacked tensor corresponding to the pairs, whose sums give the totals of all the years at once
+    pair_indices = (origin_indices[:, None] * number_of_airports + dest_indices[None, :]).ravel()
+    totals = np.asarray(od_matrices[statistic]["all_years"][:, pair_indices].sum(axis=1)).ravel()
+
+    return totals
+
+
+def get_hub_totals(od_matrices, statistic, airports, direction="origin"):
+    """
+    This function returns, for every year, the total of a statistic of all the flights leaving (or arriving at) a group
+    of airports, e.g. everything out of the NYC area.
+    :param od_matrices: Dictionary produced by init_od_matrices.
+    :param statistic: String representing the statistic, one of STATISTICS.
+    :param airports: List of strings representing the three letter codes of the airports.
+    :param direction: String, "origin" for the outbound flights (row sums) or "dest" for the inbound flights (column
+    sums).
+    :return totals: Array containing the total for each year of od_matrices["years"].
+    Raises a ValueError if we have no air trafic data for any of the airports.
+    """
+    if statistic not in STATISTICS:
+        raise ValueError("Unknown statistic '%s', expected one of %s" % (statistic, ", ".join(STATISTICS)))
+    if direction not in ["origin", "dest"]:
+        raise ValueError("Unknown direction '%s', expected 'origin' or 'dest'" % direction)
+    airport_indices = get_airport_indices(od_matrices, airports)
+    if len(airport_indices) == 0:
+        raise ValueError("No air trafic data for the airports %s" % ", ".join(airports))
+    sums = od_matrices[statistic]["outbound" if direction == "origin" else "inbound"]
+    totals = np.sum(sums[:, airport_indices], axis=1)
+
+    return totals
@@ -1,12 +1,20 @@
+import hashlib
 import pandas as pd
 import numpy as np
 
 if __name__ != "__main__":
-    from predictions.AR import full_prediction_AR
-    from predictions.fuel_consumption import compute_CO2_emissions, compute_definitive_coefficients
+    from predictions.AR import full_prediction_AR, prediction_intervals_AR
+    from predictions.fuel_consumption import compute_definitive_coefficients, compute_CO2_emissions_of_all_routes
+    from predictions.leaderboard import init_leaderboards
+    from predictions.od_matrices import init_od_matrices, get_metro_totals
 else:
-    from AR import full_prediction_AR
-    from fuel_consumption import compute_CO2_emissions, compute_definitive_coefficients
+    from AR import full_prediction_AR, prediction_intervals_AR
+    from fuel_consumption import compute_definitive_coefficients, compute_CO2_emissions_of_all_routes
+    from leaderboard import init_leaderboards
+    from od_matrices import init_od_matrices, get_metro_totals
+
+# Seed of the residual bootstrap, so that the same request always gets the same prediction intervals
+BOOTSTRAP_SEED = 0
 
 
 def init_app(app):
@@ -34,10 +42,36 @@ def init_app(app):
     app.iata_to_fuel = pd.read_csv('Air traffic data/fuel_consumption.csv', index_col=False, encoding='UTF-8')
     # Parameters used to compute the fuel consumption of each aircraft
     app.coefs_of_dot_codes = compute_definitive_coefficients(app.data_by_year, app.dot_to_iata, app.iata_to_fuel)
+    # Number of passengers and CO2 emissions of every route (origin, destination) for each year
+    routes_by_year = {}
+    for year_str in app.data_by_year:
+        routes_by_year[year_str] = compute_CO2_emissions_of_all_routes(app.data_by_year[year_str],
+                                                                       app.coefs_of_dot_codes)
+    # Statistics of every route and every airport, sorted once and for all to answer ranked queries
+    app.route_leaderboards, app.airport_leaderboards = init_leaderboards(routes_by_year)
+    # Statistics of every route stored as sparse origin x destination matrices to answer metro area and hub queries
+    app.od_matrices = init_od_matrices(routes_by_year)
+    # Version of the data, which changes whenever the statistics of a route change
+    app.dataset_version = compute_dataset_version(routes_by_year)
 
     return app
 
 
+def compute_dataset_version(routes_by_year):
+    """
+    This function computes a short hash of the statistics of every route, used to identify the version of the data
+    served, e.g. in HTTP cache validators.
+    :param routes_by_year: Dictionary mapping each year to a pandas.DataFrame with one row per route.
+    :return dataset_version: String representing the version of the data.
+    """
+    sha = hashlib.sha1()
+    for year_str in sorted(routes_by_year.keys()):
+        sha.update(year_str.encode())
+        sha.update(pd.util.hash_pandas_object(routes_by_year[year_str], index=False).values.tobytes())
+
+    return sha.hexdigest()[:16]
+
+
 def select_rows(df):
     """
     This function gets relevant data from data corresponding to one year of air trafic data.
@@ -74,66 +108,64 @@ def count_people_air_travelling(data_by_year, origin, dest, year):
     return number_of_people
 
 
-def generate_statistics_for_request(city_pairs, data_by_year, coefs_of_dot_codes, number_of_years_to_predict=6,
-                                    order_AR=3):
+def generate_statistics_for_airports(origins, dests, od_matrices, number_of_years_to_predict=6, order_AR=3,
+                                     quantiles=None, number_of_paths=2000, random_state=BOOTSTRAP_SEED):
     """
     This function returns a list containing statistics for different years about the number of people air traveling
-    between a given origin and destination as well as the corresponding carbon emissions.
-    :param city_pairs: list of tuples containing two strings each representing airport codes (origin, destination).
-    This list contains more than one tuple when there are several airports near the origin or the destination.
-    :param data_by_year: dictionary containing yearly air trafic data produced by the select_row function.
-    :param coefs_of_dot_codes: Dictionary containing the polynomial fuel consumption model of different aircrafts.
+    between the airports near an origin and the airports near a destination (e.g. between two metro areas) as well as
+    the corresponding carbon emissions. The totals of all the pairs of airports for all the years are read at once from
+    the origin x destination matrices.
+    :param origins: list of strings representing the three letter codes of the origin airports.
+    :param dests: list of strings representing the three letter codes of the destination airports.
+    :param od_matrices: dictionary containing the origin x destination matrices produced by init_od_matrices.
     :param number_of_years_to_predict: integer representing the number of future years for which we wich to predict statistics.
     :param order_AR: integer representing the order of the AR model.
+    :param quantiles: list of floats between 0 and 1. If given, the quantiles of the predictions, computed by residual
+    bootstrap of the AR model used for the predictions, are added to each predicted year.
+    :param number_of_paths: integer representing the number of bootstrap paths simulated.
+    :param random_state: seed used to draw the bootstrap residuals.
     :return statistics: list of dictionaries containing statistics about the number of people air traveling and the
-    corresponding carbon emissions.
+    corresponding carbon emissions, or None if we have no data about these airports.
     """
+    past_statistics_people = get_metro_totals(od_matrices, "number_of_people", origins, dests).astype(int)
+    past_statistics_CO2 = get_metro_totals(od_matrices, "carbon_emission", origins, dests).astype(int)
+    past_years = [str(year) for year in od_matrices["years"]]
 
-    # If we have not found the airports near the selected locations
-    if len(city_pairs) == 0:
-        return None
+    return create_statistics(past_years, past_statistics_people, past_statistics_CO2, number_of_years_to_predict,
+                             order_AR, quantiles, number_of_paths, random_state)
 
+
+def create_statistics(past_years, past_statistics_people, past_statistics_CO2, number_of_years_to_predict, order_AR,
+                      quantiles, number_of_paths, random_state=BOOTSTRAP_SEED):
+    """
+    This function predicts statistics for future years from the statistics of past years and returns them in the format
+    sent to the user.
+    :param past_years: sorted list of the years for which we have air trafic data.
+    :param past_statistics_people: array containing the number of people air traveling for each past year.
+    :param past_statistics_CO2: array containing the carbon emissions for each past year.
+    :param number_of_years_to_predict: integer representing the number of future years for which we wich to predict statistics.
+    :param order_AR: integer representing the order of the AR model.
+    :param quantiles: list of floats between 0 and 1, or None if no prediction interval is needed.
+    :param number_of_paths: integer representing the number of bootstrap paths simulated.
+    :param random_state: seed used to draw the bootstrap residuals. With a fixed seed the same past statistics always
+    give the same prediction intervals.
+    :return statistics: list of dictionaries containing statistics about the number of people air traveling and the
+    corresponding carbon emissions, or None if there is no data.
+    """
     # 1. We first gather statistics about past years for which we have air trafic data
 
     statistics = []  # Initialization of the statistics
-    past_years = sorted(data_by_year.keys())  # These years correspond to years for which we have air trafic data
-
-    # Past statistics corresponding to years for which we have data will be used to predict statistics for future years
-    past_statistics_people = np.zeros((len(past_years)), int)
-    past_statistics_CO2 = np.zeros((len(past_years)), int)
-
-    # Check if we find interesting data during our computation
-    valid_data = False
 
     for y_idx in range(len(past_years)):  # For each year for which we have air trafic data
-        # We add this year to the final statistics
         statistics.append({
             "year": int(past_years[y_idx]),
-            "number_of_people": 0,  # Initialization of the number of people
-            "carbon_emission": 0,  # Initialization of the carbon emission
+            "number_of_people": int(past_statistics_people[y_idx]),
+            "carbon_emission": int(past_statistics_CO2[y_idx]),
             "prediction": False})  # This year corresponds to a year for which we have data and not to a prediction
 
-        for origin, dest in city_pairs:  # For each pair of origin airport and destination airport
-            # a. We count the number of people which traveled by plane between this origin and this destination
-            number_of_people_air_travelling = count_people_air_travelling(data_by_year, origin, dest,
-                                                                          int(past_years[y_idx]))
-            # We keep track of this statistic to later compute predictions
-            past_statistics_people[y_idx] += number_of_people_air_travelling
-
-            statistics[y_idx]["number_of_people"] += int(number_of_people_air_travelling)
-
-            # If we have data about people air traveling between this origin and this destination during this year
-            if number_of_people_air_travelling != 0:
-                # b. We compute the CO2 emissions corresponding to the total CO2 emissions produced by aircrafts which
-                # flew between this origin and this destination during this year
-                CO2_emissions = compute_CO2_emissions(origin, dest, int(past_years[y_idx]), data_by_year,
-                                                      coefs_of_dot_codes)
-                past_statistics_CO2[
-                    y_idx] += CO2_emissions  # We keep track of this statistic to later compute predictions
-                statistics[y_idx]["carbon_emission"] += int(CO2_emissions)
-
-        if statistics[y_idx]["carbon_emission"] != 0 and statistics[y_idx]["number_of_people"] != 0:
-            valid_data = True
+    # Check if we have found interesting data
+    if not np.any((past_statistics_people != 0) & (past_statistics_CO2 != 0)):
+        return None
 
     # 2. We then predict statistics for the coming years for which we wish to predict statistics
 
@@ -150,7 +182,51 @@ def generate_statistics_for_request(city_pairs, data_by_year, coefs_of_dot_codes
             "carbon_emission": int(next_statistics_CO2[y_idx]),  # Prediction of the carbon emission
             "prediction": True})  # This year corresponds to a year for which we predict data
 
-    if not valid_data:
-        return None
+    # 3. If requested, we add prediction intervals to the predicted years
+    if quantiles is not None:
+        # The bootstrap paths are simulated with the same AR model as the predictions so that the predictions lie
+        # within their intervals
+        quantiles_people = prediction_intervals_AR(past_statistics_people[None, :], order_AR,
+                                                   number_of_years_to_predict, quantiles, number_of_paths, random_state)
+        quantiles_CO2 = prediction_intervals_AR(past_statistics_CO2[None, :], order_AR, number_of_years_to_predict,
+                                                quantiles, number_of_paths, random_state)
+        for y_idx in range(number_of_years_to_predict):
+            statistics[len(past_years) + y_idx]["number_of_people_quantiles"] = {
+                str(q): int(quantiles_people[q_idx][y_idx]) for q_idx, q in enumerate(quantiles)}
+            statistics[len(past_years) + y_idx]["carbon_emission_quantiles"] = {
+                str(q): int(quantiles_CO2[q_idx][y_idx]) for q_idx, q in enumerate(quantiles)}
 
     return statistics
+
+
+def statistics_to_columns(statistics):
+    """
+    This function converts statistics from a list of rows (one dictionary per year) to a dictionary of columns (one
+    list per key), which is smaller once serialized since the keys are not repeated for each year.
+    For instance [{"year": 2018, "prediction": False}, {"year": 2019, "prediction": False}] becomes
+    {"year": [2018, 2019], "prediction": [False, False]}. Dictionaries such as the quantiles of the predictions are
+    converted the same way, e.g. {"0.05": [None, 120], "0.95": [None, 180]}. Keys missing from some years are set to
+    None for these years.
+    :param statistics: list of dictionaries as returned by create_statistics, or None.
+    :return columns: dictionary containing one list per key, or None.
+    """
+    if statistics is None:
+        return None
+
+    keys = []
+    for row in statistics:
+        keys += [key for key in row if key not in keys]
+    columns = {}
+    for key in keys:
+        values = [row.get(key) for row in statistics]
+        sub_keys = []
+        for value in values:
+            if isinstance(value, dict):
+                sub_keys += [sub_key for sub_key in value if sub_key not in sub_keys]
+        if len(sub_keys) != 0:
+            columns[key] = {sub_key: [value.get(sub_key) if isinstance(value, dict) else None for value in values]
+                            for sub_key in sub_keys}
+        else:
+            columns[key] = values
+
+    return columns
@@ -1,15 +1,25 @@
 import sys
 import os
+import gzip
+import math
+import hashlib
 
 from flask import Flask
 from flask import request, json, render_template
 from predictions import prediction
-from predictions.prediction import generate_statistics_for_request
-from predictions.get_ap_code import get_ap_codes
+from predictions.prediction import generate_statistics_for_airports, statistics_to_columns, BOOTSTRAP_SEED
+from predictions.get_ap_code import get_nearby_airports
 from predictions.fuel_consumption import other_transport
+from predictions.leaderboard import get_top_routes, get_top_airports
+from predictions.od_matrices import get_hub_totals, get_unknown_airports
 from dotenv import load_dotenv
 load_dotenv()
 
+try:
+    import brotli
+except ImportError:  # brotli is optional, responses are compressed with gzip only when it is not installed
+    brotli = None
+
 if os.getenv("GMAPS_API_KEY") is None:
     sys.exit(-1)
 
@@ -18,23 +28,208 @@ app = Flask(__name__)
 # Init the app state relative to the prediction model
 app = prediction.init_app(app)
 
+# Responses smaller than this number of bytes are not worth compressing
+MIN_SIZE_TO_COMPRESS = 500
+COMPRESSIBLE_MIMETYPES = ["application/json", "application/javascript", "text/javascript", "text/css", "text/html"]
+# Static files requested with their version in the URL never change, browsers can keep them for a year
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+# Versions of the static files and compressed static files, computed once since static files do not change while the
+# server runs
+static_versions = {}
+compressed_static_files = {}
+
+
+def get_static_version(filename):
+    """
+    This function returns a short hash of the content of a static file, used to version its URL.
+    :param filename: String representing the path of the file in the static folder.
+    :return version: String representing the version of the file.
+    """
+    if filename not in static_versions:
+        with open(os.path.join(app.static_folder, filename), "rb") as f:
+            static_versions[filename] = hashlib.sha1(f.read()).hexdigest()[:12]
+
+    return static_versions[filename]
+
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    # url_for('static', filename=...) returns URLs containing the version of the file, e.g. /static/d3.min.js?v=1a2b3c
+    if endpoint == "static" and "filename" in values and "v" not in values:
+        values["v"] = get_static_version(values["filename"])
+
+
+def compress(data, encoding):
+    """
+    This function compresses the body of a response.
+    :param data: Bytes representing the body of the response.
+    :param encoding: String representing the content coding, "br" or "gzip".
+    :return compressed_data: Bytes representing the compressed body.
+    """
+    if encoding == "br":
+        return brotli.compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+@app.after_request
+def compress_response(response):
+    # Static files requested with their version can be cached forever by browsers and proxies
+    if request.endpoint == "static" and request.args.get("v") is not None:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+
+    if response.status_code != 200 or "Content-Encoding" in response.headers \
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    encoding = request.accept_encodings.best_match(["br", "gzip"] if brotli is not None else ["gzip"])
+    if encoding is None:
+        return response
+
+    # Static files are sent as a file stream, we need to read them to compress them
+    response.direct_passthrough = False
+    if request.endpoint == "static":
+        key = (request.path, encoding)
+        if key not in compressed_static_files:
+            data = response.get_data()
+            compressed_static_files[key] = compress(data, encoding) if len(data) >= MIN_SIZE_TO_COMPRESS else None
+        compressed_data = compressed_static_files[key]
+    else:
+        data = response.get_data()
+        compressed_data = compress(data, encoding) if len(data) >= MIN_SIZE_TO_COMPRESS else None
+
+    if compressed_data is None:
+        return response
+    response.set_data(compressed_data)
+    response.headers["Content-Encoding"] = encoding
+    # The compressed body is not byte for byte the same as the original one, so its ETag can only be weak
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def parse_quantiles(quantiles):
+    """
+    This function checks the quantiles requested for the prediction intervals.
+    :param quantiles: List of numbers, string of comma separated numbers (from a query string) or None.
+    :return quantiles: List of floats between 0 and 1, or None if no prediction interval is requested.
+    """
+    if quantiles is None:
+        return None
+    if isinstance(quantiles, str):
+        quantiles = quantiles.split(",")
+        try:
+            quantiles = [float(q) for q in quantiles]
+        except ValueError:
+            raise ValueError("quantiles must be numbers between 0 and 1")
+    if not isinstance(quantiles, list) or len(quantiles) == 0 \
+            or any(isinstance(q, bool) or not isinstance(q, (int, float)) or not 0 <= q <= 1 for q in quantiles):
+        raise ValueError("quantiles must be a non-empty list of numbers between 0 and 1")
+
+    return [float(q) for q in quantiles]
+
+
+def parse_number(value, name):
+    """
+    This function converts a parameter of a request to a finite number.
+    :param value: Number or string representing the value of the parameter.
+    :param name: String representing the name of the parameter, used in the error message.
+    :return number: Float value of the parameter.
+    Raises a ValueError if the parameter is not a finite number.
+    """
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("%s must be a number" % name)
+    if not math.isfinite(number):
+        raise ValueError("%s must be a finite number" % name)
+
+    return number
+
+
+def parse_statistics_request():
+    """
+    This function reads the parameters of a request to /statistics, either from the JSON body of a POST request or from
+    the query string of a GET request, e.g.
+    /statistics?origin_lat=40.7&origin_lng=-74.0&destination_lat=41.9&destination_lng=-87.6&distance=790&format=columnar
+    :return origin_geolocation, destination_geolocation, distance, quantiles, response_format: The parameters of the
+    request. quantiles is None if no prediction interval is requested.
+    Raises a ValueError if the parameters are not valid.
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True)
+        try:
+            params = {
+                "origin_lat": data["origin"]["geolocation"]["lat"],
+                "origin_lng": data["origin"]["geolocation"]["lng"],
+                "destination_lat": data["destination"]["geolocation"]["lat"],
+                "destination_lng": data["destination"]["geolocation"]["lng"],
+                "distance": data["distance"],
+                # Optional list of quantiles, e.g. [0.05, 0.5, 0.95], used to add prediction intervals to the
+                # predicted years
+                "quantiles": data.get("quantiles"),
+                "format": data.get("format", "rows")}
+        except (KeyError, TypeError, AttributeError):
+            raise ValueError("The body must contain origin.geolocation, destination.geolocation and distance")
+    else:
+        params = request.args.to_dict()
+        missing_params = [name for name in ["origin_lat", "origin_lng", "destination_lat", "destination_lng",
+                                            "distance"] if name not in params]
+        if len(missing_params) != 0:
+            raise ValueError("Missing parameters: %s" % ", ".join(missing_params))
+
+    origin_geolocation      = (parse_number(params["origin_lat"], "origin_lat"),
+                               parse_number(params["origin_lng"], "origin_lng"))
+    destination_geolocation = (parse_number(params["destination_lat"], "destination_lat"),
+                               parse_number(params["destination_lng"], "destination_lng"))
+    distance = parse_number(params["distance"], "distance")
+    quantiles = parse_quantiles(params.get("quantiles"))
+    response_format = params.get("format", "rows")
+    if response_format not in ["rows", "columnar"]:
+        raise ValueError("format must be 'rows' or 'columnar'")
+
+    return origin_geolocation, destination_geolocation, distance, quantiles, response_format
+
 
 @app.route("/")
 def index_handler():
     return render_template("index.html", api_key=os.getenv("GMAPS_API_KEY"))
 
 
-@app.route("/statistics", methods=["POST"])
+@app.route("/statistics", methods=["GET", "POST"])
 def statistics_handler():
-    data = request.json
+    try:
+        origin_geolocation, destination_geolocation, distance, quantiles, response_format = parse_statistics_request()
+    except ValueError as e:
+        return json.jsonify({"error": str(e)}), 400
+
+    origins = get_nearby_airports(app.all_airports, origin_geolocation)
+    destinations = get_nearby_airports(app.all_airports, destination_geolocation)
 
-    origin_geolocation      = (data["origin"]["geolocation"]["lat"],      data["origin"]["geolocation"]["lng"])
-    destination_geolocation = (data["destination"]["geolocation"]["lat"], data["destination"]["geolocation"]["lng"])
+    # The response only depends on the data, the airports found near the origin and the destination, the other
+    # parameters of the request and the seed of the bootstrap used for the prediction intervals, so a client which
+    # already has it does not need to receive it again
+    etag = hashlib.sha1(json.dumps([app.dataset_version, sorted(origins), sorted(destinations), distance, quantiles,
+                                    BOOTSTRAP_SEED, response_format]).encode()).hexdigest()
+    if request.method == "GET" and request.if_none_match.contains_weak(etag):
+        return "", 304, {"ETag": 'W/"%s"' % etag, "Cache-Control": "no-cache"}
 
-    city_pairs = get_ap_codes(app.all_airports, origin_geolocation, destination_geolocation)
-    result = generate_statistics_for_request(city_pairs, app.data_by_year, app.coefs_of_dot_codes)
+    result = generate_statistics_for_airports(origins, destinations, app.od_matrices, quantiles=quantiles)
+    if response_format == "columnar":
+        result = statistics_to_columns(result)
 
-    car_emissions, train_emissions = other_transport(data["distance"])
+    car_emissions, train_emissions = other_transport(distance)
+    if response_format == "columnar":
+        car_emissions = statistics_to_columns(car_emissions)
+        train_emissions = statistics_to_columns(train_emissions)
 
     result = {
         "planes": result,
@@ -42,4 +237,76 @@ def statistics_handler():
         "train": train_emissions,
     }
 
-    return json.jsonify(result)
+    response = json.jsonify(result)
+    # The ETag is weak since the same response can be sent with different content codings
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True  # Clients must check that the response is still valid before reusing it
+
+    return response
+
+
+def parse_int_arg(name, default=None):
+    """
+    This function reads an integer parameter of the query string.
+    :param name: String representing the name of the parameter.
+    :param default: Value returned when the parameter is not given.
+    :return value: Integer value of the parameter, or default.
+    Raises a ValueError if the parameter is not an integer.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("%s must be an integer" % name)
+
+
+@app.route("/leaderboard/routes", methods=["GET"])
+def routes_leaderboard_handler():
+    try:
+        result = get_top_routes(app.route_leaderboards,
+                                metric=request.args.get("metric", "number_of_people"),
+                                year=parse_int_arg("year"),
+                                origin=request.args.get("origin"),
+                                dest=request.args.get("destination"),
+                                number_of_routes=parse_int_arg("limit", 50))
+    except ValueError as e:
+        return json.jsonify({"error": str(e)}), 400
+
+    return json.jsonify({"routes": result})
+
+
+@app.route("/leaderboard/airports", methods=["GET"])
+def airports_leaderboard_handler():
+    try:
+        result = get_top_airports(app.airport_leaderboards,
+                                  metric=request.args.get("metric", "number_of_people"),
+                                  year=parse_int_arg("year"),
+                                  direction=request.args.get("direction", "origin"),
+                                  number_of_airports=parse_int_arg("limit", 50))
+    except ValueError as e:
+        return json.jsonify({"error": str(e)}), 400
+
+    return json.jsonify({"airports": result})
+
+
+@app.route("/hub", methods=["GET"])
+def hub_handler():
+    airports = [code.strip().upper() for code in request.args.get("airports", "").split(",") if code.strip()]
+    if len(airports) == 0:
+        return json.jsonify({"error": "airports must be a comma separated list of airport codes"}), 400
+    try:
+        totals = {statistic: get_hub_totals(app.od_matrices, statistic, airports,
+                                            direction=request.args.get("direction", "origin"))
+                  for statistic in ["number_of_people", "carbon_emission"]}
+    except ValueError as e:
+        return json.jsonify({"error": str(e)}), 400
+
+    result = [{"year": year,
+               "number_of_people": int(totals["number_of_people"][y_idx]),
+               "carbon_emission": int(totals["carbon_emission"][y_idx])}
+              for y_idx, year in enumerate(app.od_matrices["years"])]
+
+    # Airports for which we have no data are not part of the totals
+    return json.jsonify({"hub": result, "ignored_airports": get_unknown_airports(app.od_matrices, airports)})
@@ -158,20 +158,50 @@ function makeRequestData(directions, originDetails, destinationDetails) {
     };
 }
 
+//Convert columnar data ({key: [values]}) sent by the backend back to a list of rows ([{key: value}])
+function columnsToRows(columns) {
+    if (!columns) return columns;
+    const keys = Object.keys(columns);
+    if (keys.length == 0) return [];
+    return columns[keys[0]].map((_, i) => {
+	let row = {};
+	keys.forEach(key => {
+	    if (Array.isArray(columns[key])) {
+		row[key] = columns[key][i];
+	    } else {
+		row[key] = {};
+		Object.keys(columns[key]).forEach(subKey => { row[key][subKey] = columns[key][subKey][i]; });
+	    }
+	});
+	return row;
+    });
+}
+
 //Obtain trip information/computations from the backend
+//The request is a GET request so that the browser can revalidate cached responses with their ETag
 function getTripStatistics(requestData) {
-    return fetch(URL, {
-	method: "POST",
+    const params = new URLSearchParams({
+	origin_lat: requestData.origin.geolocation.lat,
+	origin_lng: requestData.origin.geolocation.lng,
+	destination_lat: requestData.destination.geolocation.lat,
+	destination_lng: requestData.destination.geolocation.lng,
+	distance: requestData.distance,
+	format: "columnar",
+    });
+    return fetch(`${URL}?${params.toString()}`, {
+	method: "GET",
 	mode: "cors",
-	headers: {
-	    "Content-Type": "application/json",
-	},
-	body: JSON.stringify(requestData),
     }).then(response => {
 	if (!response.ok) {
 	    throw new Error("Bad response");
 	}
 	return response.json();
+    }).then(data => {
+	return {
+	    planes: columnsToRows(data.planes),
+	    cars: columnsToRows(data.cars),
+	    train: columnsToRows(data.train),
+	};
     });
 }
 